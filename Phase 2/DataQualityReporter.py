@@ -1,71 +1,90 @@
-import pandas as pd
+import io
 import numpy as np
 from datetime import datetime
+from pathlib import Path
+
+from build_features import get_merged
 
 class DataQualityReporter:
     def __init__(self, patients_path, visits_path, billing_path):
         """Initializes the reporter by loading and merging datasets."""
-        self.patients = pd.read_csv(patients_path)
-        self.visits = pd.read_csv(visits_path)
-        self.billing = pd.read_csv(billing_path)
-        
-        # Merge logic following the project schema
-        self.df = self.visits.merge(self.patients, on='patient_id', how='left')
-        self.df = self.df.merge(self.billing, on='visit_id', how='left')
+        # Shares the merge (and its Parquet cache) with the feature pipeline;
+        # department/insurance_provider come back as categoricals, profiled via their codes
+        self.df = get_merged(patients_path, visits_path, billing_path)
         
-        self.report_content = []
+        self._out = io.StringIO()
+
+    def _add_line(self, line):
+        """Appends one line of Markdown to the report buffer."""
+        self._out.write(line)
+        self._out.write("\n")
 
-    def _get_outlier_count(self, series):
-        """Helper to calculate outliers using the IQR method."""
-        Q1 = series.quantile(0.25)
-        Q3 = series.quantile(0.75)
+    def _most_frequent(self, col):
+        """Returns the most common value of a categorical column via a bincount over its codes."""
+        cat = self.df[col].cat
+        codes = cat.codes.to_numpy()
+        counts = np.bincount(codes[codes >= 0], minlength=len(cat.categories))
+        return cat.categories[counts.argmax()]
+
+    def _get_outlier_count(self, arr):
+        """Helper to calculate outliers per column of a 2-D array using the IQR method (NaNs are ignored)."""
+        Q1, Q3 = np.nanquantile(arr, [0.25, 0.75], axis=0)
         IQR = Q3 - Q1
         lower = Q1 - 1.5 * IQR
         upper = Q3 + 1.5 * IQR
-        return ((series < lower) | (series > upper)).sum(), lower, upper
+        # NaN compares False on both sides, so missing values are never counted
+        return np.count_nonzero((arr < lower) | (arr > upper), axis=0), lower, upper
 
     def generate_report(self, output_file="Data_Quality_Report.md"):
         """Compiles the statistical findings into a Markdown file."""
         
         # 1. Header
-        self.report_content.append("# Phase 2: Data Quality & Reliability Report")
-        self.report_content.append(f"**Generated on:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        self._add_line("# Phase 2: Data Quality & Reliability Report")
+        self._add_line(f"**Generated on:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
         
         # 2. Executive Summary
-        self.report_content.append("## 1. Executive Summary")
-        self.report_content.append(f"Total Records Analyzed: **{len(self.df):,}**")
-        self.report_content.append("This report evaluates the completeness and validity of the hospital datasets.")
+        self._add_line("## 1. Executive Summary")
+        self._add_line(f"Total Records Analyzed: **{len(self.df):,}**")
+        self._add_line("This report evaluates the completeness and validity of the hospital datasets.")
+
+        # Read every profiled column into one float64 matrix so nulls and quartiles
+        # come from a single scan instead of separate per-column passes.
+        cols = ['approved_amount', 'payment_days', 'length_of_stay_hours', 'billed_amount']
+        col_idx = {col: i for i, col in enumerate(cols)}
+        arr = self.df[cols].to_numpy(dtype=np.float64, na_value=np.nan)
+        null_counts = np.isnan(arr).sum(axis=0)
+        outlier_counts, lower_bounds, upper_bounds = self._get_outlier_count(arr)
 
         # 3. Completeness Analysis
-        self.report_content.append("\n## 2. Missing Value Analysis (Completeness)")
-        self.report_content.append("| Field | Null Count | % Missing | Status |")
-        self.report_content.append("| :--- | :--- | :--- | :--- |")
+        self._add_line("\n## 2. Missing Value Analysis (Completeness)")
+        self._add_line("| Field | Null Count | % Missing | Status |")
+        self._add_line("| :--- | :--- | :--- | :--- |")
         
         for col in ['approved_amount', 'payment_days', 'length_of_stay_hours']:
-            nulls = self.df[col].isnull().sum()
+            nulls = int(null_counts[col_idx[col]])
             pct = (nulls / len(self.df)) * 100
             status = "✅ OK" if pct < 1 else "⚠️ WARNING"
-            self.report_content.append(f"| {col} | {nulls:,} | {pct:.2f}% | {status} |")
+            self._add_line(f"| {col} | {nulls:,} | {pct:.2f}% | {status} |")
 
         # 4. Outlier Analysis
-        self.report_content.append("\n## 3. Outlier Detection (Validity)")
-        self.report_content.append("| Metric | Outlier Count | Lower Bound | Upper Bound |")
-        self.report_content.append("| :--- | :--- | :--- | :--- |")
+        self._add_line("\n## 3. Outlier Detection (Validity)")
+        self._add_line("| Metric | Outlier Count | Lower Bound | Upper Bound |")
+        self._add_line("| :--- | :--- | :--- | :--- |")
         
         for col in ['billed_amount', 'payment_days', 'length_of_stay_hours']:
-            count, lb, ub = self._get_outlier_count(self.df[col].dropna())
-            self.report_content.append(f"| {col} | {count:,} | {lb:,.2f} | {ub:,.2f} |")
+            i = col_idx[col]
+            count, lb, ub = int(outlier_counts[i]), lower_bounds[i], upper_bounds[i]
+            self._add_line(f"| {col} | {count:,} | {lb:,.2f} | {ub:,.2f} |")
 
         # 5. Distribution Analysis (Brief)
-        self.report_content.append("\n## 4. Operational Distributions")
-        top_dept = self.df['department'].value_counts().idxmax()
-        top_provider = self.df['insurance_provider'].value_counts().idxmax()
-        self.report_content.append(f"- **High Volume Department:** {top_dept}")
-        self.report_content.append(f"- **Primary Insurance Provider:** {top_provider}")
+        self._add_line("\n## 4. Operational Distributions")
+        top_dept = self._most_frequent('department')
+        top_provider = self._most_frequent('insurance_provider')
+        self._add_line(f"- **High Volume Department:** {top_dept}")
+        self._add_line(f"- **Primary Insurance Provider:** {top_provider}")
 
         # Write to file
-        with open(output_file, "w") as f:
-            f.write("\n".join(self.report_content))
+        Path(output_file).write_text(self._out.getvalue(), encoding="utf-8")
         
         print(f"✅ Report successfully generated: {output_file}")
 
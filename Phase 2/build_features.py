@@ -1,59 +1,157 @@
+import json
 import pandas as pd
 import numpy as np
+import polars as pl
+import pyarrow as pa
+import pyarrow.csv as pac
+import pyarrow.parquet as pq
+from pathlib import Path
 
-def load_and_merge_data(patients_path, visits_path, billing_path):
-    """Loads CSVs and merges them into a single analytical base table."""
-    patients = pd.read_csv(patients_path)
-    visits = pd.read_csv(visits_path)
-    billing = pd.read_csv(billing_path)
+# Narrow numeric dtypes: ids fit in int32 and the measures need no more than float32
+# precision, which halves the bytes moved by every merge and window aggregation.
+PATIENT_DTYPES = {'patient_id': pl.Int32}
+VISIT_DTYPES = {'visit_id': pl.Int32, 'patient_id': pl.Int32, 'length_of_stay_hours': pl.Float32}
+BILLING_DTYPES = {
+    'visit_id': pl.Int32,
+    'billed_amount': pl.Float32,
+    'approved_amount': pl.Float32,
+    'payment_days': pl.Float32,
+}
+FLOAT32_COLUMNS = ['length_of_stay_hours', 'billed_amount', 'approved_amount', 'payment_days']
+# Low-cardinality text columns; as categoricals, group keys are small integer codes
+CATEGORICAL_COLUMNS = ['insurance_provider', 'department', 'city', 'gender', 'visit_type']
 
-    # Convert date columns to datetime objects
-    patients['registration_date'] = pd.to_datetime(patients['registration_date'])
-    visits['visit_date'] = pd.to_datetime(visits['visit_date'])
-    billing['billing_date'] = pd.to_datetime(billing['billing_date'])
+# Calendar dates; Polars hands them to pandas as midnight timestamps
+DATE_COLUMNS = ['visit_date', 'registration_date', 'billing_date']
+
+MERGED_CACHE_PATH = 'merged.parquet'
+# Bump whenever _merge_csvs changes the table it produces, so existing caches are rebuilt
+MERGED_CACHE_VERSION = 1
+MERGED_CACHE_KEY = b'hospital.merged_cache'
+
+def _merge_csvs(patients_path, visits_path, billing_path):
+    """Loads CSVs and merges them into a single analytical base table."""
+    # Polars parses the CSVs (and the date columns, via try_parse_dates) in parallel;
+    # convert to Arrow-backed pandas frames for the merges below.
+    patients = pl.read_csv(patients_path, try_parse_dates=True, schema_overrides=PATIENT_DTYPES).to_pandas(use_pyarrow_extension_array=True)
+    visits = pl.read_csv(visits_path, try_parse_dates=True, schema_overrides=VISIT_DTYPES).to_pandas(use_pyarrow_extension_array=True)
+    billing = pl.read_csv(billing_path, try_parse_dates=True, schema_overrides=BILLING_DTYPES).to_pandas(use_pyarrow_extension_array=True)
 
     # Merge: Patients -> Visits -> Billing
     df = pd.merge(visits, patients, on='patient_id', how='left')
     df = pd.merge(df, billing, on='visit_id', how='left')
+
+    # Keep the measures float32 after the left joins so downstream features stay narrow
+    df = df.astype({c: 'float32[pyarrow]' for c in FLOAT32_COLUMNS})
     
     return df
 
-def engineer_features(df):
-    """Applies business logic to create predictive features."""
-    
-    # 1. Patient Frequency: How many times has this patient visited the hospital?
-    df['patient_visit_count'] = df.groupby('patient_id')['visit_id'].transform('count')
-
-    # 2. Patient History: Average Length of Stay (LoS) for this patient across all visits
-    df['avg_los_per_patient'] = df.groupby('patient_id')['length_of_stay_hours'].transform('mean')
-
-    # 3. Provider Reliability: Rejection Rate for each insurance provider
-    # Logic: (Count of Rejected Claims / Total Claims) per provider
-    rejection_rates = df.groupby('insurance_provider')['claim_status'].apply(
-        lambda x: (x == 'Rejected').mean()
-    ).reset_index()
-    rejection_rates.columns = ['insurance_provider', 'provider_rejection_rate']
-    df = pd.merge(df, rejection_rates, on='insurance_provider', how='left')
-
-    # 4. Loyalty/Tenure: Days since the patient first registered at the hospital
-    df['days_since_registration'] = (df['visit_date'] - df['registration_date']).dt.days
-
-    # 5. Time-based Features (Seasonality/Peak Times)
-    df['visit_month'] = df['visit_date'].dt.month
-    df['visit_day_of_week'] = df['visit_date'].dt.dayofweek
-    
+def _cache_signature(sources):
+    """Identifies what a merged cache was built from: schema version plus each CSV's path, size and mtime."""
+    return {
+        'version': MERGED_CACHE_VERSION,
+        'dtypes': repr([PATIENT_DTYPES, VISIT_DTYPES, BILLING_DTYPES]),
+        'sources': [
+            {'path': str(p.resolve()), 'size': p.stat().st_size, 'mtime_ns': p.stat().st_mtime_ns}
+            for p in sources
+        ],
+    }
+
+def _cached_signature(cache):
+    """Reads the signature stored in a cache's Parquet metadata (None if missing or unreadable)."""
+    try:
+        metadata = pq.read_schema(cache).metadata or {}
+        return json.loads(metadata[MERGED_CACHE_KEY])
+    except (OSError, KeyError, ValueError, pa.ArrowException):
+        return None
+
+def get_merged(patients_path, visits_path, billing_path, cache=MERGED_CACHE_PATH):
+    """Returns the merged base table, reusing a Parquet cache built from exactly these CSVs."""
+    cache = Path(cache)
+    sources = [Path(p) for p in (patients_path, visits_path, billing_path)]
+    signature = _cache_signature(sources)
+    if cache.exists() and _cached_signature(cache) == signature:
+        df = pd.read_parquet(cache, engine='pyarrow', dtype_backend='pyarrow')
+    else:
+        df = _merge_csvs(patients_path, visits_path, billing_path)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        metadata = {**(table.schema.metadata or {}), MERGED_CACHE_KEY: json.dumps(signature).encode()}
+        pq.write_table(table.replace_schema_metadata(metadata), cache, compression='zstd')
+
+    for c in CATEGORICAL_COLUMNS:
+        df[c] = df[c].astype('category')
     return df
 
+def load_and_merge_data(patients_path, visits_path, billing_path):
+    """Loads the merged analytical base table (from the Parquet cache when available)."""
+    return get_merged(patients_path, visits_path, billing_path)
+
+def engineer_features(df):
+    """Applies business logic to create predictive features.
+
+    All features are expressed as a single Polars lazy query so the per-patient and
+    per-provider window aggregations are planned together and run in parallel.
+    """
+    lf = pl.from_pandas(df).lazy()
+
+    lf = lf.with_columns([
+        # 1. Patient Frequency: How many times has this patient visited the hospital?
+        pl.col('visit_id').count().over('patient_id').cast(pl.Int64).alias('patient_visit_count'),
+
+        # 2. Patient History: Average Length of Stay (LoS) for this patient across all visits
+        pl.col('length_of_stay_hours').mean().over('patient_id').alias('avg_los_per_patient'),
+
+        # 3. Provider Reliability: Rejection Rate for each insurance provider
+        # Logic: (Count of Rejected Claims / Total Claims) per provider.
+        # .over() would pool null providers (visits with no matching patient) into one group; keep them NaN
+        pl.when(pl.col('insurance_provider').is_null()).then(None).otherwise(
+            (pl.col('claim_status') == 'Rejected').fill_null(False).cast(pl.Float64)
+            .mean().over('insurance_provider')
+        ).alias('provider_rejection_rate'),
+
+        # 4. Loyalty/Tenure: Days since the patient first registered at the hospital
+        (pl.col('visit_date') - pl.col('registration_date')).dt.total_days().alias('days_since_registration'),
+
+        # 5. Time-based Features (Seasonality/Peak Times); weekday() is 1-based, keep Monday=0
+        pl.col('visit_date').dt.month().alias('visit_month'),
+        (pl.col('visit_date').dt.weekday() - 1).alias('visit_day_of_week'),
+    ])
+
+    return lf.collect().to_pandas()
+
 def handle_missing_and_clean(df):
     """Final cleaning before saving the modeling table."""
     # Fill missing approved amounts with 0 for rejected/pending claims
-    df['approved_amount'] = df['approved_amount'].fillna(0)
+    approved = df['approved_amount'].to_numpy(dtype=np.float32, na_value=np.nan, copy=True)
+    np.nan_to_num(approved, copy=False, nan=0.0)
+    df['approved_amount'] = approved
     
-    # Fill missing payment_days with a flag or mean (here using median)
-    df['payment_days'] = df['payment_days'].fillna(df['payment_days'].median())
+    # Fill missing payment_days with a flag or mean (here using median);
+    # nanpercentile selects the median by partial sort instead of a full sort
+    payment_days = df['payment_days'].to_numpy(dtype=np.float32, na_value=np.nan, copy=True)
+    missing = np.isnan(payment_days)
+    if missing.any():
+        payment_days[missing] = np.nanpercentile(payment_days, 50)
+    df['payment_days'] = payment_days
     
     return df
 
+def write_csv(df, output_path):
+    """Writes the modeling table with Arrow's C++ CSV writer (no index column).
+
+    Dates keep the YYYY-MM-DD form of ``DataFrame.to_csv``; unlike ``to_csv``, Arrow
+    double-quotes every string cell and header name (standard CSV, read back unchanged).
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for i, field in enumerate(table.schema):
+        # Categorical columns arrive as dictionary arrays; write their plain values
+        if pa.types.is_dictionary(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(field.type.value_type))
+        # Date columns would otherwise print as full timestamps (2025-10-18 00:00:00.000)
+        elif field.name in DATE_COLUMNS and pa.types.is_timestamp(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.date32()))
+    pac.write_csv(table, output_path, write_options=pac.WriteOptions(include_header=True))
+
 def main():
     print("Starting Feature Engineering Pipeline...")
     
@@ -68,7 +166,7 @@ def main():
     
     # Export
     output_path = 'model_table.csv'
-    df.to_csv(output_path, index=False)
+    write_csv(df, output_path)
     
     print(f"Success! Modeling dataset saved to: {output_path}")
     print(f"Features created: {len(df.columns)} total columns.")
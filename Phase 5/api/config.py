@@ -28,3 +28,8 @@ CLAIM_MODEL_VERSION = os.getenv("CLAIM_MODEL_VERSION", "1.0.0")
 API_TITLE = "Hospital Prediction API"
 API_VERSION = "1.0.0"
 LOG_PREDICTIONS = os.getenv("LOG_PREDICTIONS", "true").lower() == "true"
+
+# Micro-batching: concurrent single /predict/risk calls arriving within the wait window
+# are scored together in one model call (up to the max batch size)
+RISK_BATCH_MAX_SIZE = int(os.getenv("RISK_BATCH_MAX_SIZE", "32"))
+RISK_BATCH_MAX_WAIT_MS = float(os.getenv("RISK_BATCH_MAX_WAIT_MS", "2"))
@@ -4,12 +4,15 @@ FastAPI service for visit risk and claim outcome predictions.
 """
 import logging
 import sys
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from api.config import API_TITLE, API_VERSION
 from api.routers import health_router, predictions_router
+from api.services.batching import risk_batcher
+from api.services.warmup import warmup
 
 # Configure logging so prediction_log entries are visible
 logging.basicConfig(
@@ -18,10 +21,21 @@ logging.basicConfig(
     stream=sys.stdout,
 )
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load models and feature schema at startup so the first request is not a cold path."""
+    warmup()
+    risk_batcher.start()
+    yield
+    await risk_batcher.stop()
+
+
 app = FastAPI(
     title=API_TITLE,
     version=API_VERSION,
     description="Real-time predictions for visit risk and claim outcome (Phase 5).",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -3,19 +3,25 @@ Health check endpoint for load balancers and monitoring.
 """
 from fastapi import APIRouter
 
-from api.config import API_VERSION, FEATURE_SCHEMA_PATH, RISK_MODEL_PATH, CLAIM_MODEL_PATH
+from api.config import API_VERSION
 from api.schemas import HealthResponse
+from api.services.warmup import (
+    claim_model_loaded,
+    feature_schema_loaded,
+    is_ready,
+    risk_model_loaded,
+)
 
 router = APIRouter(tags=["health"])
 
 
 @router.get("/health", response_model=HealthResponse)
 def health() -> HealthResponse:
-    """Liveness/readiness: reports whether models and schema are loaded."""
-    risk_loaded = RISK_MODEL_PATH.exists()
-    claim_loaded = CLAIM_MODEL_PATH.exists()
-    schema_loaded = FEATURE_SCHEMA_PATH.exists()
-    status = "ok" if (risk_loaded and claim_loaded) else "degraded"
+    """Liveness/readiness: reports whether startup warmup finished and models and schema are loaded."""
+    risk_loaded = risk_model_loaded()
+    claim_loaded = claim_model_loaded()
+    schema_loaded = feature_schema_loaded()
+    status = "ok" if (is_ready() and risk_loaded and claim_loaded) else "degraded"
     return HealthResponse(
         status=status,
         version=API_VERSION,
@@ -15,7 +15,8 @@ from api.schemas import (
     RiskPredictionRequest,
     RiskPredictionResponse,
 )
-from api.services import predict_claim, predict_risk
+from api.services import predict_claim, predict_claim_batch, predict_risk_batch
+from api.services.batching import risk_batcher
 
 router = APIRouter(prefix="/predict", tags=["predictions"])
 
@@ -25,15 +26,15 @@ def _request_id(x_request_id: Optional[str] = Header(None, alias="X-Request-ID")
 
 
 @router.post("/risk", response_model=RiskPredictionResponse)
-def predict_visit_risk(
+async def predict_visit_risk(
     body: RiskPredictionRequest,
     x_request_id: Optional[str] = Header(None, alias="X-Request-ID"),
 ) -> RiskPredictionResponse:
     """
     Predict visit risk (Low / Medium / High) for a single visit.
-    Uses Model A from Phase 3.
+    Uses Model A from Phase 3. Concurrent calls are micro-batched into one model call.
     """
-    return predict_risk(body, request_id=x_request_id)
+    return await risk_batcher.submit(body, request_id=x_request_id)
 
 
 @router.post("/claim", response_model=ClaimPredictionResponse)
@@ -55,7 +56,7 @@ def predict_visit_risk_batch(
 ) -> RiskPredictionBatchResponse:
     """Batch risk predictions (max 100 per request)."""
     from api.config import RISK_MODEL_VERSION
-    predictions = [predict_risk(r, request_id=body.request_id or x_request_id) for r in body.requests]
+    predictions = predict_risk_batch(body.requests, request_id=body.request_id or x_request_id)
     return RiskPredictionBatchResponse(
         predictions=predictions,
         model_version=RISK_MODEL_VERSION,
@@ -70,9 +71,7 @@ def predict_claim_outcome_batch(
 ) -> ClaimPredictionBatchResponse:
     """Batch claim predictions (max 100 per request)."""
     from api.config import CLAIM_MODEL_VERSION
-    predictions = [
-        predict_claim(r, request_id=body.request_id or x_request_id) for r in body.requests
-    ]
+    predictions = predict_claim_batch(body.requests, request_id=body.request_id or x_request_id)
     return ClaimPredictionBatchResponse(
         predictions=predictions,
         model_version=CLAIM_MODEL_VERSION,
@@ -1,5 +1,5 @@
-from .claim_model import predict_claim
+from .claim_model import predict_claim, predict_claim_batch
 from .prediction_logger import log_prediction
-from .risk_model import predict_risk
+from .risk_model import predict_risk, predict_risk_batch
 
-__all__ = ["predict_risk", "predict_claim", "log_prediction"]
+__all__ = ["predict_risk", "predict_risk_batch", "predict_claim", "predict_claim_batch", "log_prediction"]
@@ -0,0 +1,132 @@
+"""
+Micro-batching for single-visit risk predictions.
+Concurrent /predict/risk requests are queued and scored together in one model call,
+amortizing per-call validation and predict overhead across requests.
+"""
+import asyncio
+import logging
+from contextlib import suppress
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from api.config import RISK_BATCH_MAX_SIZE, RISK_BATCH_MAX_WAIT_MS
+from api.schemas import RiskPredictionRequest, RiskPredictionResponse
+from api.services.risk_model import predict_risk, predict_risk_many
+
+logger = logging.getLogger(__name__)
+
+
+class RiskBatcher:
+    """Coalesces requests arriving within max_wait_ms (up to max_batch) into one predict call."""
+
+    def __init__(self, max_batch: int, max_wait_ms: float):
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start the drain task on the running event loop (called from app lifespan)."""
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run(), name="risk-batcher")
+
+    async def stop(self) -> None:
+        """Cancel the drain task and fail any requests still waiting in the queue."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+        while not self._queue.empty():
+            _fail_stopped([self._queue.get_nowait()])
+
+    async def submit(
+        self, req: RiskPredictionRequest, request_id: Optional[str] = None
+    ) -> RiskPredictionResponse:
+        """Queue one request and wait for its prediction."""
+        if self._task is None:
+            # Not started (e.g. app used without lifespan): score directly
+            return await run_in_threadpool(predict_risk, req, request_id)
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((req, request_id, fut))
+        return await fut
+
+    async def _collect(self, batch: list[tuple]) -> None:
+        """Wait for one request, then gather more until the batch is full or the window closes."""
+        loop = asyncio.get_running_loop()
+        batch.append(await self._queue.get())
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+    async def _run_one(self, item: tuple) -> None:
+        """Score a single queued request and resolve its future with the response or error."""
+        req, request_id, fut = item
+        try:
+            responses = await run_in_threadpool(predict_risk_many, [req], [request_id])
+        except Exception as e:
+            logger.exception("Risk prediction failed: %s", e)
+            _set_exception(fut, e)
+            return
+        if not fut.done():
+            fut.set_result(responses[0])
+
+    async def _run(self) -> None:
+        batch: list[tuple] = []
+        try:
+            while True:
+                batch = []
+                await self._collect(batch)
+                # Skip requests whose clients already went away
+                batch = [item for item in batch if not item[2].done()]
+                if not batch:
+                    continue
+                reqs = [item[0] for item in batch]
+                request_ids = [item[1] for item in batch]
+                try:
+                    # Model inference is CPU-bound; keep it off the event loop
+                    responses = await run_in_threadpool(predict_risk_many, reqs, request_ids)
+                except Exception as e:
+                    if len(batch) == 1:
+                        logger.exception("Risk prediction failed: %s", e)
+                        _set_exception(batch[0][2], e)
+                        continue
+                    # One bad request (e.g. a non-finite value) must not fail the others batched
+                    # with it: score each request alone so every caller gets its own outcome
+                    logger.warning(
+                        "Risk batch prediction failed (%s); scoring %d requests individually", e, len(batch)
+                    )
+                    await asyncio.gather(*(self._run_one(item) for item in batch))
+                    continue
+                for (_, _, fut), response in zip(batch, responses):
+                    if not fut.done():
+                        fut.set_result(response)
+        except asyncio.CancelledError:
+            # Requests already taken off the queue (being collected or scored) would otherwise hang
+            _fail_stopped(batch)
+            raise
+
+
+def _set_exception(fut: asyncio.Future, exc: BaseException) -> None:
+    """Fail a request's future unless its caller already has an outcome (or went away)."""
+    if not fut.done():
+        fut.set_exception(exc)
+
+
+def _fail_stopped(items: list[tuple]) -> None:
+    """Fail the futures of queued requests that will never be scored."""
+    for _, _, fut in items:
+        _set_exception(fut, RuntimeError("Risk batcher stopped"))
+
+
+risk_batcher = RiskBatcher(RISK_BATCH_MAX_SIZE, RISK_BATCH_MAX_WAIT_MS)
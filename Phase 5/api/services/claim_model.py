@@ -4,62 +4,114 @@ Loads pickle (.pkl) artifact; runs prediction with logging.
 Builds feature vector to match model's fit-time schema (feature_names_in_) when present.
 """
 import logging
+import threading
 from typing import Any, Optional
 
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from api.config import CLAIM_MODEL_PATH, CLAIM_MODEL_VERSION, FEATURE_SCHEMA_PATH
 from api.schemas import ClaimPredictionRequest, ClaimPredictionResponse, ClaimStatus
+from api.services.model_input import needs_frame
 from api.services.prediction_logger import log_prediction
 
 logger = logging.getLogger(__name__)
 
 _claim_model = None
 _feature_schema = None
+_load_lock = threading.Lock()
 
 
 def _load_model():
     global _claim_model
     if _claim_model is not None:
         return _claim_model
-    if not CLAIM_MODEL_PATH.exists():
-        logger.warning("Claim model file not found at %s", CLAIM_MODEL_PATH)
-        return None
-    try:
+    # Serialize first load so concurrent requests don't each unpickle the model
+    with _load_lock:
+        if _claim_model is not None:
+            return _claim_model
+        if not CLAIM_MODEL_PATH.exists():
+            logger.warning("Claim model file not found at %s", CLAIM_MODEL_PATH)
+            return None
         try:
-            import joblib
-            raw = joblib.load(CLAIM_MODEL_PATH)
-        except Exception:
-            import pickle
-            with open(CLAIM_MODEL_PATH, "rb") as f:
-                raw = pickle.load(f)
-        if isinstance(raw, dict) and "model" in raw:
-            _claim_model = raw["model"]
-            logger.info("Claim model loaded from %s (unwrapped from dict)", CLAIM_MODEL_PATH)
-        else:
-            _claim_model = raw
-            logger.info("Claim model loaded from %s", CLAIM_MODEL_PATH)
-        if not hasattr(_claim_model, "predict_proba"):
-            logger.warning(
-                "Claim model has no predict_proba; responses will have probabilities=null"
-            )
-        return _claim_model
-    except Exception as e:
-        logger.exception("Failed to load claim model: %s", e)
-        return None
+            try:
+                import joblib
+                # mmap_mode: large numpy arrays (tree nodes, coefs) are memory-mapped read-only
+                # and shared through the page cache across workers; needs an uncompressed dump.
+                raw = joblib.load(CLAIM_MODEL_PATH, mmap_mode="r")
+            except Exception:
+                import pickle
+                with open(CLAIM_MODEL_PATH, "rb") as f:
+                    raw = pickle.load(f)
+            if isinstance(raw, dict) and "model" in raw:
+                model = raw["model"]
+                logger.info("Claim model loaded from %s (unwrapped from dict)", CLAIM_MODEL_PATH)
+            else:
+                model = raw
+                logger.info("Claim model loaded from %s", CLAIM_MODEL_PATH)
+            # Resolve fit-time feature names once (cached on the model); build the row plan from them
+            feature_names = _get_model_feature_names(model)
+            if feature_names:
+                model._row_plan = _compile_row_plan(feature_names)
+            model._needs_frame = needs_frame(model)
+            if not hasattr(model, "predict_proba"):
+                logger.warning(
+                    "Claim model has no predict_proba; responses will have probabilities=null"
+                )
+            # Publish only once fully prepared (readers outside the lock see all or nothing)
+            _claim_model = model
+            return _claim_model
+        except Exception as e:
+            logger.exception("Failed to load claim model: %s", e)
+            return None
 
 
 def _get_model_feature_names(model: Any) -> Optional[list[str]]:
-    """Return the list of feature names the model was fit with, or None."""
-    if hasattr(model, "feature_names_in_") and model.feature_names_in_ is not None:
-        return list(model.feature_names_in_)
-    if hasattr(model, "steps") and model.steps:
-        last = model.steps[-1][1]
-        if hasattr(last, "feature_names_in_") and last.feature_names_in_ is not None:
-            return list(last.feature_names_in_)
-    if hasattr(model, "named_steps"):
-        for name in reversed(list(model.named_steps.keys())):
-            step = model.named_steps[name]
-            if hasattr(step, "feature_names_in_") and step.feature_names_in_ is not None:
-                return list(step.feature_names_in_)
+    """Return the list of feature names the model was fit with, or None (resolved once, cached on the model)."""
+    try:
+        return model._cached_feature_names
+    except AttributeError:
+        pass
+    names = _resolve_model_feature_names(model)
+    try:
+        model._cached_feature_names = names
+    except AttributeError:
+        pass  # object doesn't accept new attributes; resolve again next time
+    return names
+
+
+def _resolve_model_feature_names(model: Any) -> Optional[list[str]]:
+    # try/except instead of hasattr + getattr: one attribute lookup on the success path
+    try:
+        if model.feature_names_in_ is not None:
+            return list(model.feature_names_in_)
+    except AttributeError:
+        pass
+    # Pipeline: try last step (classifier) or pipeline itself
+    try:
+        steps = model.steps
+    except AttributeError:
+        steps = None
+    if steps:
+        try:
+            if steps[-1][1].feature_names_in_ is not None:
+                return list(steps[-1][1].feature_names_in_)
+        except AttributeError:
+            pass
+    try:
+        named_steps = model.named_steps
+    except AttributeError:
+        return None
+    for name in reversed(list(named_steps.keys())):
+        try:
+            if named_steps[name].feature_names_in_ is not None:
+                return list(named_steps[name].feature_names_in_)
+        except AttributeError:
+            continue
     return None
 
 
@@ -70,9 +122,13 @@ def _load_feature_schema() -> Optional[dict]:
     if not FEATURE_SCHEMA_PATH.exists():
         return None
     try:
-        import json
-        with open(FEATURE_SCHEMA_PATH) as f:
-            _feature_schema = json.load(f)
+        if orjson is not None:
+            with open(FEATURE_SCHEMA_PATH, "rb") as f:
+                _feature_schema = orjson.loads(f.read())
+        else:
+            import json
+            with open(FEATURE_SCHEMA_PATH) as f:
+                _feature_schema = json.load(f)
         return _feature_schema
     except Exception as e:
         logger.warning("Could not load feature schema: %s", e)
@@ -83,56 +139,146 @@ def _request_to_features(req: ClaimPredictionRequest) -> dict[str, Any]:
     return req.model_dump(exclude_none=True, by_alias=False)
 
 
-def _build_row_for_claim_model_feature_names(
-    feature_names: list[str], req: ClaimPredictionRequest
-) -> dict[str, Any]:
+def _norm(s: Optional[str]) -> str:
+    return (s or "").replace("_", " ").lower()
+
+
+# String request fields: the only prefixes that drive one-hot columns (prefix_value).
+# Other undeclared names with "_" (e.g. risk_score, sent as an extra field) are numeric copies.
+_CATEGORICAL_FIELDS = frozenset(
+    name
+    for name, field in ClaimPredictionRequest.model_fields.items()
+    if field.annotation in (str, Optional[str])
+)
+
+
+def _compile_row_plan(feature_names: list[str]) -> tuple[list[tuple[int, str]], dict[str, dict[str, int]]]:
     """
-    Build a single row dict with keys exactly feature_names, using request fields.
-    Handles: numeric fields, one-hot columns (prefix_value), age/chronic_flag defaults.
-    Model expects numeric X only (no strings).
+    Classify each feature name once at load time:
+    - copy plan: (column index, field) for numeric request fields (declared or extra)
+    - one-hot map: {prefix: {normalized value: column index}} for one-hot columns (prefix_value)
+      whose prefix is a string request field,
+      so category names from the model are normalized here rather than per request
     """
-    raw = _request_to_features(req)
-    row: dict[str, Any] = {}
-    for name in feature_names:
-        if name in row:
-            continue
-        if name in raw and raw.get(name) is not None:
-            val = raw[name]
-            if isinstance(val, (int, float)) and not isinstance(val, bool):
-                row[name] = val
-                continue
-        if "_" in name:
-            parts = name.split("_", 1)
-            prefix, rest = parts[0], parts[1]
-            req_val = raw.get(prefix)
-            if req_val is not None and isinstance(req_val, str):
-                norm = lambda s: (s or "").replace("_", " ").lower()
-                row[name] = 1.0 if norm(rest) == norm(req_val) else 0.0
+    declared = ClaimPredictionRequest.model_fields
+    copies: list[tuple[int, str]] = []
+    one_hot: dict[str, dict[str, int]] = {}
+    for idx, name in enumerate(feature_names):
+        if "_" in name and name not in declared:
+            prefix, rest = name.split("_", 1)
+            if prefix in _CATEGORICAL_FIELDS:
+                one_hot.setdefault(prefix, {}).setdefault(_norm(rest), idx)
                 continue
-        if name == "age":
-            row[name] = raw.get("age") if raw.get("age") is not None else 0.0
-            continue
-        if name == "chronic_flag":
-            row[name] = raw.get("chronic_flag") if raw.get("chronic_flag") is not None else 0.0
-            continue
-        row[name] = 0.0
-    return row
+        copies.append((idx, name))
+    return copies, one_hot
+
 
+def _fill_claim_row(
+    out: np.ndarray, plan: tuple[list[tuple[int, str]], dict[str, dict[str, int]]], raw: dict[str, Any]
+) -> None:
+    """
+    Fill a zero-initialized row from request fields using the precompiled plan.
+    Missing or non-numeric values stay 0.0 (including age/chronic_flag).
+    Model expects numeric X only (no strings).
+    """
+    copies, one_hot = plan
+    for idx, field in copies:
+        val = raw.get(field)
+        if isinstance(val, (int, float)) and not isinstance(val, bool):
+            out[idx] = val
+    # Only the request value is normalized per call; one dict lookup per categorical field
+    for prefix, columns in one_hot.items():
+        req_val = raw.get(prefix)
+        if isinstance(req_val, str):
+            idx = columns.get(_norm(req_val))
+            if idx is not None:
+                out[idx] = 1.0
+
+
+def _build_frame(model: Any, features: list[dict[str, Any]]) -> Any:
+    """
+    Build one input matrix with a row per request feature dict (from _request_to_features),
+    aligned to the model's fit-time feature names (a float ndarray, or a DataFrame if the
+    model was fit on or selects named columns). Falls back to a DataFrame from the feature schema / raw fields.
+    """
+    model_feature_names = _get_model_feature_names(model)
+    if model_feature_names:
+        x = np.zeros((len(features), len(model_feature_names)), dtype=np.float64)
+        for i, raw in enumerate(features):
+            _fill_claim_row(x[i], model._row_plan, raw)
+        if model._needs_frame:
+            # The Phase 3 notebooks fit on pd.get_dummies DataFrames, so their models take this branch
+            import pandas as pd
+            return pd.DataFrame(x, columns=model_feature_names, copy=False)
+        # pandas-free path: only for models fit on unnamed arrays
+        return x
+    # pandas is only needed where a DataFrame is built (named-column models and the fallbacks below)
+    import pandas as pd
+    schema = _load_feature_schema()
+    claim_features = (schema or {}).get("claim", {}).get("features") if isinstance(schema, dict) else None
+    if claim_features:
+        return pd.DataFrame([[f.get(k) for k in claim_features] for f in features], columns=claim_features)
+    return pd.DataFrame(features)
 
-def _predict_with_proba(model: Any, features: dict) -> tuple:
+
+def _infer(model: Any, frame: Any) -> tuple[list[str], list[Optional[dict[str, float]]]]:
+    """Run the model once over all rows; return per-row labels and probabilities (if available)."""
+    n = len(frame)
     if hasattr(model, "predict_proba"):
-        probs = model.predict_proba(features)
+        probs = model.predict_proba(frame)
         if hasattr(model, "classes_"):
-            classes = list(model.classes_)
-            proba_dict = {str(c): float(p) for c, p in zip(classes, probs[0])}
+            classes = [str(c) for c in model.classes_]
+            proba_dicts = [{c: float(p) for c, p in zip(classes, row)} for row in probs]
+            # Same label predict() would return (classes_[argmax]), without a second model pass
+            labels = [classes[i] for i in np.argmax(probs, axis=1)]
+            return labels, proba_dicts
         else:
-            proba_dict = None
-        pred = model.predict(features)
-        label = str(pred[0]) if hasattr(pred, "__getitem__") else str(pred)
-        return label, proba_dict
-    pred = model.predict(features)
-    label = str(pred[0]) if hasattr(pred, "__getitem__") else str(pred)
-    return label, None
+            proba_dicts = [None] * n
+    else:
+        proba_dicts = [None] * n
+    pred = model.predict(frame)
+    labels = [str(p) for p in pred] if hasattr(pred, "__getitem__") else [str(pred)] * n
+    return labels, proba_dicts
+
+
+def predict_claim_batch(
+    reqs: list[ClaimPredictionRequest], request_id: Optional[str] = None
+) -> list[ClaimPredictionResponse]:
+    """
+    Run claim outcome classification for many requests with a single model call.
+    If model is not loaded, returns fallback Pending for every request.
+    """
+    if not reqs:
+        return []
+    features = [_request_to_features(req) for req in reqs]
+    model = _load_model()
+    if model is None:
+        responses = []
+        for f in features:
+            log_prediction("claim_model", CLAIM_MODEL_VERSION, request_id, f, "Pending", None)
+            responses.append(
+                ClaimPredictionResponse(
+                    claim_status=ClaimStatus.PENDING,
+                    probabilities=None,
+                    model_version=CLAIM_MODEL_VERSION,
+                    request_id=request_id,
+                )
+            )
+        return responses
+    labels, probs = _infer(model, _build_frame(model, features))
+    responses = []
+    for f, label, p in zip(features, labels, probs):
+        claim_status = _normalize_claim_status(label)
+        log_prediction("claim_model", CLAIM_MODEL_VERSION, request_id, f, claim_status, p)
+        responses.append(
+            ClaimPredictionResponse(
+                claim_status=claim_status,
+                probabilities=p,
+                model_version=CLAIM_MODEL_VERSION,
+                request_id=request_id,
+            )
+        )
+    return responses
 
 
 def predict_claim(
@@ -142,45 +288,17 @@ def predict_claim(
     Run claim outcome classification and return response.
     If model is not loaded, returns fallback Pending with model version.
     """
-    features = _request_to_features(req)
-    model = _load_model()
-    if model is None:
-        log_prediction("claim_model", CLAIM_MODEL_VERSION, request_id, features, "Pending", None)
-        return ClaimPredictionResponse(
-            claim_status=ClaimStatus.PENDING,
-            probabilities=None,
-            model_version=CLAIM_MODEL_VERSION,
-            request_id=request_id,
-        )
-    import pandas as pd
-    model_feature_names = _get_model_feature_names(model)
-    if model_feature_names:
-        row = _build_row_for_claim_model_feature_names(model_feature_names, req)
-        ordered = [row[n] for n in model_feature_names]
-        feature_vector = pd.DataFrame([ordered], columns=model_feature_names)
-    else:
-        schema = _load_feature_schema()
-        claim_features = (schema or {}).get("claim", {}).get("features") if isinstance(schema, dict) else None
-        if claim_features and isinstance(features, dict):
-            ordered = [features.get(k) for k in claim_features]
-            feature_vector = pd.DataFrame([ordered], columns=claim_features)
-        else:
-            feature_vector = pd.DataFrame([features]) if isinstance(features, dict) else pd.DataFrame([features])
-    label, probs = _predict_with_proba(model, feature_vector)
-    claim_status = _normalize_claim_status(label)
-    log_prediction("claim_model", CLAIM_MODEL_VERSION, request_id, features, claim_status, probs)
-    return ClaimPredictionResponse(
-        claim_status=claim_status,
-        probabilities=probs,
-        model_version=CLAIM_MODEL_VERSION,
-        request_id=request_id,
-    )
+    return predict_claim_batch([req], request_id=request_id)[0]
+
+
+# Normalized model output label -> ClaimStatus (anything else maps to Pending)
+_LABEL_TO_CLAIM_STATUS = {
+    "rejected": ClaimStatus.REJECTED,
+    "reject": ClaimStatus.REJECTED,
+    "paid": ClaimStatus.PAID,
+    "accept": ClaimStatus.PAID,
+}
 
 
 def _normalize_claim_status(label: str) -> ClaimStatus:
-    s = (label or "").strip().lower()
-    if s in ("rejected", "reject"):
-        return ClaimStatus.REJECTED
-    if s in ("paid", "accept"):
-        return ClaimStatus.PAID
-    return ClaimStatus.PENDING
+    return _LABEL_TO_CLAIM_STATUS.get((label or "").strip().lower(), ClaimStatus.PENDING)
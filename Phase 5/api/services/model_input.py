@@ -0,0 +1,24 @@
+"""
+Model input helpers shared by the risk and claim services.
+Decides whether a model gets a positional ndarray or a named-column DataFrame.
+Models fit on DataFrames (including those from the Phase 3 notebooks, which use pd.get_dummies)
+always get a DataFrame; the ndarray path, which never imports pandas, is for models fit on unnamed arrays.
+"""
+from typing import Any
+
+
+def needs_frame(model: Any) -> bool:
+    """
+    True if the model must receive a DataFrame rather than an ndarray in fit-time column order:
+    - the estimator receiving X was fit on named columns (sklearn warns
+      "X does not have valid feature names" for ndarray input), or
+    - it selects input columns by name (e.g. a Pipeline with a ColumnTransformer).
+    """
+    try:
+        # Pipelines delegate this to their first step, i.e. the estimator that receives X
+        if model.feature_names_in_ is not None:
+            return True
+    except AttributeError:
+        pass
+    steps = getattr(model, "steps", None) or []
+    return any(hasattr(step, "transformers") for _, step in steps)
@@ -1,24 +1,104 @@
 """
 Prediction logging for audit and governance.
 Logs timestamp, model version, input feature hash, and prediction outcome.
+Events are queued by the request thread and hashed/emitted by a background thread.
 """
+import atexit
 import hashlib
 import json
 import logging
+import queue
+import threading
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Optional
 
 from api.config import LOG_PREDICTIONS
 
+# Optional fast paths: orjson for canonical serialization, BLAKE3 for hashing.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    from blake3 import blake3
+except ImportError:
+    blake3 = None
+
 logger = logging.getLogger(__name__)
 
 
+def _canonical_json(features: dict) -> bytes:
+    """Compact, key-sorted UTF-8 JSON of the input features."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(
+                features, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS, default=str
+            )
+        except orjson.JSONEncodeError:
+            pass  # e.g. an extra integer field beyond 64 bits; the stdlib encoder takes anything
+    return json.dumps(
+        features, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    ).encode()
+
+
 def _feature_hash(features: dict) -> str:
-    """Compute a stable hash of the input features for idempotency/audit."""
-    # Sort keys for deterministic hash
-    canonical = json.dumps(features, sort_keys=True, default=str)
-    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+    """
+    Compute a stable hash of the input features for idempotency/audit.
+    Both encoders emit compact, key-sorted JSON, so typical inputs (strings, ints, ordinary floats)
+    hash the same with or without orjson; edge values such as NaN or 1e-7 are spelled differently.
+    BLAKE3 and the BLAKE2b fallback give different digests for the same input,
+    so only compare hashes logged by deployments with the same hashing backend.
+    """
+    canonical = _canonical_json(features)
+    # 8-byte digest -> 16 hex chars, same width as before
+    if blake3 is not None:
+        return blake3(canonical).hexdigest(length=8)
+    return hashlib.blake2b(canonical, digest_size=8).hexdigest()
+
+
+_LOG_Q: "queue.SimpleQueue[Optional[dict]]" = queue.SimpleQueue()
+
+
+def _drain_loop() -> None:
+    """Hash queued events and emit them via the logger until a None sentinel arrives."""
+    while True:
+        event = _LOG_Q.get()
+        if event is None:
+            return
+        # A prediction was served either way: a hashing failure must not drop its audit record
+        try:
+            input_feature_hash = _feature_hash(event["features"])
+        except Exception as e:
+            input_feature_hash = None
+            logger.warning(
+                "prediction_log_hash_failed",
+                extra={"request_id": event["request_id"], "error": str(e)},
+            )
+        try:
+            payload = {
+                "timestamp": event["timestamp"],
+                "model_name": event["model_name"],
+                "model_version": event["model_version"],
+                "request_id": event["request_id"],
+                "input_feature_hash": input_feature_hash,
+                "prediction": str(event["prediction"]),
+                "probabilities": event["probabilities"],
+            }
+            logger.info("prediction_log", extra=payload)
+        except Exception as e:
+            logger.warning("prediction_log_failed", extra={"error": str(e)})
+
+
+_drain_thread = threading.Thread(target=_drain_loop, name="prediction-log-drain", daemon=True)
+_drain_thread.start()
+
+
+@atexit.register
+def _flush_on_exit() -> None:
+    """Let queued audit events drain before the interpreter exits."""
+    _LOG_Q.put(None)
+    _drain_thread.join(timeout=5)
 
 
 def log_prediction(
@@ -31,22 +111,18 @@ def log_prediction(
 ) -> None:
     """
     Log a prediction event for monitoring and governance.
-    Only logs if LOG_PREDICTIONS is true.
+    Only logs if LOG_PREDICTIONS is true. Hashing and formatting happen off the request thread.
     """
     if not LOG_PREDICTIONS:
         return
-    try:
-        input_hash = _feature_hash(features)
-        ts = datetime.now(timezone.utc).isoformat()
-        payload = {
-            "timestamp": ts,
+    _LOG_Q.put_nowait(
+        {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
             "model_name": model_name,
             "model_version": model_version,
             "request_id": request_id,
-            "input_feature_hash": input_hash,
-            "prediction": str(prediction),
+            "features": features,
+            "prediction": prediction,
             "probabilities": probabilities,
         }
-        logger.info("prediction_log", extra=payload)
-    except Exception as e:
-        logger.warning("prediction_log_failed", extra={"error": str(e)})
+    )
@@ -4,55 +4,80 @@ Loads pickle (.pkl) artifact and feature schema; runs prediction with logging.
 Builds feature vector to match model's fit-time schema (feature_names_in_) when present.
 """
 import logging
+import threading
 from pathlib import Path
 from typing import Any, Optional
 
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from api.config import FEATURE_SCHEMA_PATH, RISK_MODEL_PATH, RISK_MODEL_VERSION
 from api.schemas import RiskPredictionRequest, RiskPredictionResponse, RiskScore
+from api.services.model_input import needs_frame
 from api.services.prediction_logger import log_prediction
 
 logger = logging.getLogger(__name__)
 
 _risk_model = None
 _feature_schema = None
+_load_lock = threading.Lock()
 
 # API request field name -> model fit-time name (when different)
 _RISK_FIELD_TO_MODEL = {
     "avg_length_of_stay_patient": "avg_los_per_patient",
 }
+# Model fit-time name -> API request field name (reverse lookup for row building)
+_MODEL_TO_RISK_FIELD = {v: k for k, v in _RISK_FIELD_TO_MODEL.items()}
 
 
 def _load_model():
     global _risk_model
     if _risk_model is not None:
         return _risk_model
-    if not RISK_MODEL_PATH.exists():
-        logger.warning("Risk model file not found at %s", RISK_MODEL_PATH)
-        return None
-    try:
-        # Support both joblib and pickle: many sklearn/training flows save with joblib even as .pkl
+    # Serialize first load so concurrent requests don't each unpickle the model
+    with _load_lock:
+        if _risk_model is not None:
+            return _risk_model
+        if not RISK_MODEL_PATH.exists():
+            logger.warning("Risk model file not found at %s", RISK_MODEL_PATH)
+            return None
         try:
-            import joblib
-            raw = joblib.load(RISK_MODEL_PATH)
-        except Exception:
-            import pickle
-            with open(RISK_MODEL_PATH, "rb") as f:
-                raw = pickle.load(f)
-        # Unwrap if artifact is a dict (e.g. {"model": estimator, "encoder": ...})
-        if isinstance(raw, dict) and "model" in raw:
-            _risk_model = raw["model"]
-            logger.info("Risk model loaded from %s (unwrapped from dict)", RISK_MODEL_PATH)
-        else:
-            _risk_model = raw
-            logger.info("Risk model loaded from %s", RISK_MODEL_PATH)
-        if not hasattr(_risk_model, "predict_proba"):
-            logger.warning(
-                "Risk model has no predict_proba; responses will have probabilities=null"
-            )
-        return _risk_model
-    except Exception as e:
-        logger.exception("Failed to load risk model: %s", e)
-        return None
+            # Support both joblib and pickle: many sklearn/training flows save with joblib even as .pkl
+            try:
+                import joblib
+                # mmap_mode: large numpy arrays (tree nodes, coefs) are memory-mapped read-only
+                # and shared through the page cache across workers; needs an uncompressed dump.
+                raw = joblib.load(RISK_MODEL_PATH, mmap_mode="r")
+            except Exception:
+                import pickle
+                with open(RISK_MODEL_PATH, "rb") as f:
+                    raw = pickle.load(f)
+            # Unwrap if artifact is a dict (e.g. {"model": estimator, "encoder": ...})
+            if isinstance(raw, dict) and "model" in raw:
+                model = raw["model"]
+                logger.info("Risk model loaded from %s (unwrapped from dict)", RISK_MODEL_PATH)
+            else:
+                model = raw
+                logger.info("Risk model loaded from %s", RISK_MODEL_PATH)
+            # Resolve fit-time feature names once (cached on the model); build the row plan from them
+            feature_names = _get_model_feature_names(model)
+            if feature_names:
+                model._row_builder = _compile_row_builder(_compile_row_plan(feature_names))
+            model._needs_frame = needs_frame(model)
+            if not hasattr(model, "predict_proba"):
+                logger.warning(
+                    "Risk model has no predict_proba; responses will have probabilities=null"
+                )
+            # Publish only once fully prepared (readers outside the lock see all or nothing)
+            _risk_model = model
+            return _risk_model
+        except Exception as e:
+            logger.exception("Failed to load risk model: %s", e)
+            return None
 
 
 def _load_feature_schema() -> Optional[dict]:
@@ -62,9 +87,13 @@ def _load_feature_schema() -> Optional[dict]:
     if not FEATURE_SCHEMA_PATH.exists():
         return None
     try:
-        import json
-        with open(FEATURE_SCHEMA_PATH) as f:
-            _feature_schema = json.load(f)
+        if orjson is not None:
+            with open(FEATURE_SCHEMA_PATH, "rb") as f:
+                _feature_schema = orjson.loads(f.read())
+        else:
+            import json
+            with open(FEATURE_SCHEMA_PATH) as f:
+                _feature_schema = json.load(f)
         return _feature_schema
     except Exception as e:
         logger.warning("Could not load feature schema: %s", e)
@@ -72,19 +101,47 @@ def _load_feature_schema() -> Optional[dict]:
 
 
 def _get_model_feature_names(model: Any) -> Optional[list[str]]:
-    """Return the list of feature names the model was fit with, or None."""
-    if hasattr(model, "feature_names_in_") and model.feature_names_in_ is not None:
-        return list(model.feature_names_in_)
+    """Return the list of feature names the model was fit with, or None (resolved once, cached on the model)."""
+    try:
+        return model._cached_feature_names
+    except AttributeError:
+        pass
+    names = _resolve_model_feature_names(model)
+    try:
+        model._cached_feature_names = names
+    except AttributeError:
+        pass  # object doesn't accept new attributes; resolve again next time
+    return names
+
+
+def _resolve_model_feature_names(model: Any) -> Optional[list[str]]:
+    # try/except instead of hasattr + getattr: one attribute lookup on the success path
+    try:
+        if model.feature_names_in_ is not None:
+            return list(model.feature_names_in_)
+    except AttributeError:
+        pass
     # Pipeline: try last step (classifier) or pipeline itself
-    if hasattr(model, "steps") and model.steps:
-        last = model.steps[-1][1]
-        if hasattr(last, "feature_names_in_") and last.feature_names_in_ is not None:
-            return list(last.feature_names_in_)
-    if hasattr(model, "named_steps"):
-        for name in reversed(list(model.named_steps.keys())):
-            step = model.named_steps[name]
-            if hasattr(step, "feature_names_in_") and step.feature_names_in_ is not None:
-                return list(step.feature_names_in_)
+    try:
+        steps = model.steps
+    except AttributeError:
+        steps = None
+    if steps:
+        try:
+            if steps[-1][1].feature_names_in_ is not None:
+                return list(steps[-1][1].feature_names_in_)
+        except AttributeError:
+            pass
+    try:
+        named_steps = model.named_steps
+    except AttributeError:
+        return None
+    for name in reversed(list(named_steps.keys())):
+        try:
+            if named_steps[name].feature_names_in_ is not None:
+                return list(named_steps[name].feature_names_in_)
+        except AttributeError:
+            continue
     return None
 
 
@@ -93,122 +150,204 @@ def _request_to_features(req: RiskPredictionRequest) -> dict[str, Any]:
     return req.model_dump(exclude_none=True, by_alias=False)
 
 
-def _build_row_for_model_feature_names(
-    feature_names: list[str], req: RiskPredictionRequest
-) -> dict[str, Any]:
+def _norm(s: Optional[str]) -> str:
+    """Normalize a category value for one-hot matching ("Blue_Cross" == "blue cross")."""
+    return (s or "").replace("_", " ").lower()
+
+
+# String request fields: the only prefixes that drive one-hot columns (prefix_value).
+# Other undeclared names with "_" (e.g. days_since_registration, sent as an extra field) are numeric.
+_CATEGORICAL_FIELDS = frozenset(
+    name
+    for name, field in RiskPredictionRequest.model_fields.items()
+    if field.annotation in (str, Optional[str])
+)
+
+
+def _compile_row_plan(feature_names: list[str]) -> tuple[list[tuple], dict[str, dict[str, int]]]:
     """
-    Build a single row dict with keys exactly feature_names, using request fields.
-    Handles: direct numeric fields, API->model name mapping, one-hot columns (prefix_value).
+    Classify feature names once at load time:
+    - numeric plan: (column index, model name, mapped API name or None) per direct/mapped/extra feature
+    - one-hot map: {prefix: {normalized value: column index}} for prefix_value columns whose
+      prefix is a string request field, e.g. "gender_F" -> one_hot["gender"]["f"]
     """
-    raw = _request_to_features(req)
-    row: dict[str, Any] = {}
-    for name in feature_names:
-        if name in row:
-            continue
-        # Mapped name (e.g. avg_los_per_patient <- avg_length_of_stay_patient)
-        api_name = next(
-            (k for k, v in _RISK_FIELD_TO_MODEL.items() if v == name), None
-        )
-        if api_name is not None and raw.get(api_name) is not None:
-            row[name] = raw[api_name]
-            continue
-        if name in raw and raw.get(name) is not None:
-            val = raw[name]
-            # Model expects numeric X; skip string values (use one-hot or 0.0 fallback below).
-            if isinstance(val, (int, float)) and not isinstance(val, bool):
-                row[name] = val
-                continue
-            # else: val is str or other; don't set row[name] here, let one-hot or 0.0 handle it
-        # One-hot style: "gender_F", "gender_M" -> use request "gender": "F" to set gender_F=1.0, gender_M=0.0.
-        # We do not convert the string "F" to a float; we use it only to pick which one-hot column is 1.
-        if "_" in name:
-            parts = name.split("_", 1)
-            prefix, rest = parts[0], parts[1]
-            req_val = raw.get(prefix)
-            if req_val is not None and isinstance(req_val, str):
-                norm = lambda s: (s or "").replace("_", " ").lower()
-                row[name] = 1.0 if norm(rest) == norm(req_val) else 0.0
+    declared = RiskPredictionRequest.model_fields
+    numeric: list[tuple] = []
+    one_hot: dict[str, dict[str, int]] = {}
+    for idx, name in enumerate(feature_names):
+        api_name = _MODEL_TO_RISK_FIELD.get(name)
+        if "_" in name and api_name is None and name not in declared:
+            prefix, rest = name.split("_", 1)
+            if prefix in _CATEGORICAL_FIELDS:
+                one_hot.setdefault(prefix, {}).setdefault(_norm(rest), idx)
                 continue
-        # Defaults for common extra training-only features
-        if name == "age":
-            row[name] = raw.get("age") if raw.get("age") is not None else 0.0
-            continue
-        if name == "chronic_flag":
-            row[name] = raw.get("chronic_flag") if raw.get("chronic_flag") is not None else 0.0
-            continue
-        # Model expects numeric X; use 0.0 for any missing feature (no strings like "").
-        row[name] = 0.0
-    return row
+        numeric.append((idx, name, api_name))
+    return numeric, one_hot
+
+
+def _compile_row_builder(plan: tuple[list[tuple], dict[str, dict[str, int]]]) -> Any:
+    """
+    Generate a row filler specialized to the loaded model's feature schema (run once at load time).
+    Same semantics as interpreting the plan per request, but every column index, field name and
+    one-hot prefix is baked into straight-line code, leaving one dict lookup per feature:
+    - mapped features (e.g. avg_los_per_patient <- avg_length_of_stay_patient) take the API value if set
+    - numeric features take int/float values (not bool); anything missing stays 0.0
+    - request "gender": "F" sets gender_F=1.0; the other gender_* columns stay 0.0
+    """
+    numeric, one_hot = plan
+    # One-hot maps are bound once as named constants; a dict literal in the source would be rebuilt per call
+    namespace: dict[str, Any] = {}
+    lines = ["def _build_row(out, raw):", "    get = raw.get"]
+    for idx, name, api_name in numeric:
+        if api_name is not None:
+            lines += [
+                f"    v = get({api_name!r})",
+                "    if v is not None:",
+                f"        out[{idx}] = v",
+                "    else:",
+                f"        v = get({name!r})",
+                "        if v.__class__ is not bool and isinstance(v, (int, float)):",
+                f"            out[{idx}] = v",
+            ]
+        else:
+            lines += [
+                f"    v = get({name!r})",
+                "    if v.__class__ is not bool and isinstance(v, (int, float)):",
+                f"        out[{idx}] = v",
+            ]
+    for i, (prefix, columns) in enumerate(one_hot.items()):
+        # Prefixes are arbitrary feature-name text, so the constant name uses the position
+        const = f"_oh_{i}"
+        namespace[const] = columns
+        lines += [
+            f"    v = get({prefix!r})",
+            "    if isinstance(v, str):",
+            f"        idx = {const}.get(v.replace('_', ' ').lower())",
+            "        if idx is not None:",
+            "            out[idx] = 1.0",
+        ]
+    exec(compile("\n".join(lines) + "\n", "<risk_row_builder>", "exec"), namespace)
+    return namespace["_build_row"]
 
 
-def _predict_with_proba(model: Any, features: dict) -> tuple:
-    """Run model predict; return class label and probabilities if available."""
+def _build_frame(model: Any, features: list[dict[str, Any]]) -> Any:
+    """
+    Build one input matrix with a row per request feature dict (from _request_to_features),
+    aligned to the model's fit-time feature names (a float ndarray, or a DataFrame if the
+    model was fit on or selects named columns). Falls back to a DataFrame from the feature schema / raw fields.
+    """
+    model_feature_names = _get_model_feature_names(model)
+    if model_feature_names:
+        # Rows exactly match the model's fit-time feature names (order + one-hot, etc.);
+        # allocated per call so concurrent requests never share a buffer
+        x = np.zeros((len(features), len(model_feature_names)), dtype=np.float64)
+        for i, raw in enumerate(features):
+            model._row_builder(x[i], raw)
+        if model._needs_frame:
+            # The Phase 3 notebooks fit on pd.get_dummies DataFrames, so their models take this branch
+            import pandas as pd
+            return pd.DataFrame(x, columns=model_feature_names, copy=False)
+        # pandas-free path: only for models fit on unnamed arrays
+        return x
+    # pandas is only needed where a DataFrame is built (named-column models and the fallbacks below)
+    import pandas as pd
+    # Fallback: use feature_schema or plain request dicts
+    schema = _load_feature_schema()
+    risk_features = (schema or {}).get("risk", {}).get("features") if isinstance(schema, dict) else None
+    if risk_features:
+        return pd.DataFrame([[f.get(k) for k in risk_features] for f in features], columns=risk_features)
+    return pd.DataFrame(features)
+
+
+def _infer(model: Any, frame: Any) -> tuple[list[str], list[Optional[dict[str, float]]]]:
+    """Run the model once over all rows; return per-row labels and probabilities (if available)."""
+    n = len(frame)
     # Try predict_proba first (sklearn-style)
     if hasattr(model, "predict_proba"):
-        probs = model.predict_proba(features)
+        probs = model.predict_proba(frame)
         if hasattr(model, "classes_"):
-            classes = list(model.classes_)
-            proba_dict = {str(c): float(p) for c, p in zip(classes, probs[0])}
+            classes = [str(c) for c in model.classes_]
+            proba_dicts = [{c: float(p) for c, p in zip(classes, row)} for row in probs]
+            # Same label predict() would return (classes_[argmax]), without a second model pass
+            labels = [classes[i] for i in np.argmax(probs, axis=1)]
+            return labels, proba_dicts
         else:
-            proba_dict = None
-        pred = model.predict(features)
-        label = str(pred[0]) if hasattr(pred, "__getitem__") else str(pred)
-        return label, proba_dict
-    # Model has predict but not predict_proba (e.g. some wrappers or dict-saved artifacts)
-    pred = model.predict(features)
-    label = str(pred[0]) if hasattr(pred, "__getitem__") else str(pred)
-    return label, None
+            proba_dicts = [None] * n
+    else:
+        # Model has predict but not predict_proba (e.g. some wrappers or dict-saved artifacts)
+        proba_dicts = [None] * n
+    pred = model.predict(frame)
+    labels = [str(p) for p in pred] if hasattr(pred, "__getitem__") else [str(pred)] * n
+    return labels, proba_dicts
 
 
-def predict_risk(req: RiskPredictionRequest, request_id: Optional[str] = None) -> RiskPredictionResponse:
+def predict_risk_many(
+    reqs: list[RiskPredictionRequest], request_ids: list[Optional[str]]
+) -> list[RiskPredictionResponse]:
     """
-    Run risk classification and return response with model version.
-    If model is not loaded, returns a fallback response and logs warning.
+    Run risk classification for many requests with a single model call,
+    tagging each response with its own request id.
+    If model is not loaded, returns a fallback response for every request.
     """
-    features = _request_to_features(req)
+    if not reqs:
+        return []
+    features = [_request_to_features(req) for req in reqs]
     model = _load_model()
     if model is None:
         # Fallback when model not deployed (e.g. dev without artifacts)
-        log_prediction("risk_model", RISK_MODEL_VERSION, request_id, features, "Low", None)
-        return RiskPredictionResponse(
-            risk_score=RiskScore.LOW,
-            probabilities=None,
-            model_version=RISK_MODEL_VERSION,
-            request_id=request_id,
+        responses = []
+        for f, rid in zip(features, request_ids):
+            log_prediction("risk_model", RISK_MODEL_VERSION, rid, f, "Low", None)
+            responses.append(
+                RiskPredictionResponse(
+                    risk_score=RiskScore.LOW,
+                    probabilities=None,
+                    model_version=RISK_MODEL_VERSION,
+                    request_id=rid,
+                )
+            )
+        return responses
+    labels, probs = _infer(model, _build_frame(model, features))
+    responses = []
+    for f, rid, label, p in zip(features, request_ids, labels, probs):
+        risk_score = _normalize_risk_score(label)
+        log_prediction("risk_model", RISK_MODEL_VERSION, rid, f, risk_score, p)
+        responses.append(
+            RiskPredictionResponse(
+                risk_score=risk_score,
+                probabilities=p,
+                model_version=RISK_MODEL_VERSION,
+                request_id=rid,
+            )
         )
-    import pandas as pd
-    model_feature_names = _get_model_feature_names(model)
-    if model_feature_names:
-        # Build a row that exactly matches the model's fit-time feature names (order + one-hot, etc.)
-        row = _build_row_for_model_feature_names(model_feature_names, req)
-        # Use row[n] so string values (e.g. gender="F") are not replaced by 0.0
-        ordered = [row[n] for n in model_feature_names]
-        feature_vector = pd.DataFrame([ordered], columns=model_feature_names)
-    else:
-        # Fallback: use feature_schema or plain request dict
-        schema = _load_feature_schema()
-        risk_features = (schema or {}).get("risk", {}).get("features") if isinstance(schema, dict) else None
-        if risk_features and isinstance(features, dict):
-            ordered = [features.get(k) for k in risk_features]
-            feature_vector = pd.DataFrame([ordered], columns=risk_features)
-        else:
-            feature_vector = pd.DataFrame([features]) if isinstance(features, dict) else pd.DataFrame([features])
-    label, probs = _predict_with_proba(model, feature_vector)
-    risk_score = _normalize_risk_score(label)
-    log_prediction("risk_model", RISK_MODEL_VERSION, request_id, features, risk_score, probs)
-    return RiskPredictionResponse(
-        risk_score=risk_score,
-        probabilities=probs,
-        model_version=RISK_MODEL_VERSION,
-        request_id=request_id,
-    )
+    return responses
+
+
+def predict_risk_batch(
+    reqs: list[RiskPredictionRequest], request_id: Optional[str] = None
+) -> list[RiskPredictionResponse]:
+    """Run risk classification for a client-side batch sharing one request id."""
+    return predict_risk_many(reqs, [request_id] * len(reqs))
+
+
+def predict_risk(req: RiskPredictionRequest, request_id: Optional[str] = None) -> RiskPredictionResponse:
+    """
+    Run risk classification and return response with model version.
+    If model is not loaded, returns a fallback response and logs warning.
+    """
+    return predict_risk_batch([req], request_id=request_id)[0]
+
+
+# Normalized model output label -> RiskScore (anything else maps to Low)
+_LABEL_TO_RISK = {
+    "high": RiskScore.HIGH,
+    "2": RiskScore.HIGH,
+    "medium": RiskScore.MEDIUM,
+    "mid": RiskScore.MEDIUM,
+    "1": RiskScore.MEDIUM,
+}
 
 
 def _normalize_risk_score(label: str) -> RiskScore:
     """Map model output to RiskScore enum."""
-    s = (label or "").strip().lower()
-    if s in ("high", "2"):
-        return RiskScore.HIGH
-    if s in ("medium", "mid", "1"):
-        return RiskScore.MEDIUM
-    return RiskScore.LOW
+    return _LABEL_TO_RISK.get((label or "").strip().lower(), RiskScore.LOW)
@@ -0,0 +1,43 @@
+"""
+Startup warmup for the prediction services.
+Loads both models and the feature schema before traffic is served, and tracks readiness.
+"""
+import logging
+
+from api.services import claim_model, risk_model
+
+logger = logging.getLogger(__name__)
+
+_ready = False
+
+
+def warmup() -> None:
+    """Load models (plus cached feature names / row plans) and the feature schema eagerly."""
+    global _ready
+    risk_model._load_model()
+    claim_model._load_model()
+    risk_model._load_feature_schema()
+    claim_model._load_feature_schema()
+    _ready = True
+    logger.info(
+        "Warmup complete (risk_model_loaded=%s, claim_model_loaded=%s)",
+        risk_model_loaded(),
+        claim_model_loaded(),
+    )
+
+
+def is_ready() -> bool:
+    """True once warmup() has run."""
+    return _ready
+
+
+def risk_model_loaded() -> bool:
+    return risk_model._risk_model is not None
+
+
+def claim_model_loaded() -> bool:
+    return claim_model._claim_model is not None
+
+
+def feature_schema_loaded() -> bool:
+    return risk_model._feature_schema is not None or claim_model._feature_schema is not None
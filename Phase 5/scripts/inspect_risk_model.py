@@ -20,8 +20,8 @@ def main():
     # Try joblib first (common for sklearn models); fall back to pickle for .pkl from pickle.dump()
     try:
         import joblib
-        obj = joblib.load(RISK_MODEL_PATH)
-        print("(loaded with joblib)")
+        obj = joblib.load(RISK_MODEL_PATH, mmap_mode="r")
+        print("(loaded with joblib, mmap_mode='r')")
     except Exception:
         import pickle
         with open(RISK_MODEL_PATH, "rb") as f:
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Make the `api` package importable when pytest runs from Phase 5 or the repo root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
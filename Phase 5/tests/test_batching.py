@@ -0,0 +1,39 @@
+"""RiskBatcher behaviour when a request in a coalesced batch cannot be scored."""
+import asyncio
+import math
+
+from api.schemas import RiskPredictionRequest
+from api.services import batching
+
+
+def _fake_predict_risk_many(reqs, request_ids):
+    # Like a RandomForest on non-finite input: the whole call fails if any row is bad
+    if any(req.age is not None and not math.isfinite(req.age) for req in reqs):
+        raise ValueError("Input X contains infinity")
+    return [f"scored-{rid}" for rid in request_ids]
+
+
+def test_bad_request_does_not_fail_its_batch(monkeypatch):
+    monkeypatch.setattr(batching, "predict_risk_many", _fake_predict_risk_many)
+
+    async def run():
+        batcher = batching.RiskBatcher(max_batch=8, max_wait_ms=50)
+        batcher.start()
+        try:
+            ages = [30.0, float("inf"), 45.0, 60.0]
+            return await asyncio.gather(
+                *(
+                    batcher.submit(RiskPredictionRequest(department="ICU", visit_type="ER", age=age), str(i))
+                    for i, age in enumerate(ages)
+                ),
+                return_exceptions=True,
+            )
+        finally:
+            await batcher.stop()
+
+    results = asyncio.run(run())
+
+    assert results[0] == "scored-0"
+    assert isinstance(results[1], ValueError)
+    assert results[2] == "scored-2"
+    assert results[3] == "scored-3"
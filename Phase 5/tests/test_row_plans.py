@@ -0,0 +1,97 @@
+"""
+Row building against the fit-time feature lists produced by the Phase 3 notebooks
+(the columns of X after pd.get_dummies on model_table.csv).
+"""
+import numpy as np
+
+from api.schemas import ClaimPredictionRequest, RiskPredictionRequest
+from api.services import claim_model, risk_model
+
+# 03_claim_model.ipynb: risk_score is label-encoded and sent by clients as an extra field
+CLAIM_NOTEBOOK_FEATURES = [
+    "billed_amount",
+    "provider_rejection_rate",
+    "risk_score",
+    "age",
+    "chronic_flag",
+    "insurance_provider_CareOne",
+    "insurance_provider_HealthPlus",
+    "insurance_provider_MediCareX",
+    "insurance_provider_SecureLife",
+    "department_Cardiology",
+    "department_ER",
+    "department_General",
+    "department_ICU",
+    "department_Neurology",
+    "department_Orthopedics",
+]
+
+
+def test_claim_row_copies_extra_numeric_features():
+    plan = claim_model._compile_row_plan(CLAIM_NOTEBOOK_FEATURES)
+    req = ClaimPredictionRequest(
+        department="Cardiology",
+        billed_amount=23577.37,
+        insurance_provider="CareOne",
+        provider_rejection_rate=0.15,
+        age=90,
+        chronic_flag=1,
+        risk_score=2,
+    )
+    row = np.zeros(len(CLAIM_NOTEBOOK_FEATURES))
+    claim_model._fill_claim_row(row, plan, claim_model._request_to_features(req))
+    values = dict(zip(CLAIM_NOTEBOOK_FEATURES, row))
+
+    assert values["risk_score"] == 2.0
+    assert values["billed_amount"] == 23577.37
+    assert values["provider_rejection_rate"] == 0.15
+    assert values["age"] == 90.0
+    assert values["chronic_flag"] == 1.0
+    assert values["department_Cardiology"] == 1.0
+    assert all(values[f"department_{d}"] == 0.0 for d in ("ER", "General", "ICU", "Neurology", "Orthopedics"))
+
+
+# 02_risk_model.ipynb, plus engineered model_table.csv columns a retrained model may use
+RISK_FEATURES = [
+    "age",
+    "gender",
+    "chronic_flag",
+    "length_of_stay_hours",
+    "visit_frequency",
+    "avg_los_per_patient",
+    "days_since_registration",
+    "patient_visit_count",
+    "department_Cardiology",
+    "department_ER",
+    "department_General",
+    "department_ICU",
+    "department_Neurology",
+    "department_Orthopedics",
+    "visit_type_ER",
+    "visit_type_ICU",
+    "visit_type_OPD",
+]
+
+
+def test_risk_row_builder_copies_extra_numeric_features():
+    build_row = risk_model._compile_row_builder(risk_model._compile_row_plan(RISK_FEATURES))
+    req = RiskPredictionRequest(
+        department="Neurology",
+        visit_type="ER",
+        length_of_stay_hours=3.48,
+        avg_length_of_stay_patient=3.725,
+        age=90,
+        chronic_flag=1,
+        days_since_registration=65,
+        patient_visit_count=2,
+    )
+    row = np.zeros(len(RISK_FEATURES))
+    build_row(row, risk_model._request_to_features(req))
+    values = dict(zip(RISK_FEATURES, row))
+
+    assert values["days_since_registration"] == 65.0
+    assert values["patient_visit_count"] == 2.0
+    assert values["avg_los_per_patient"] == 3.725
+    assert values["length_of_stay_hours"] == 3.48
+    assert values["department_Neurology"] == 1.0
+    assert values["department_Cardiology"] == 0.0